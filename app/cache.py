@@ -0,0 +1,52 @@
+"""記憶體快取"""
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    具存活時間（TTL）與容量上限的 LRU 快取
+
+    TTL 於每次寫入時指定。過期項目不會立即刪除，直到被容量淘汰前
+    仍可透過 get_stale 取得，供上游失敗時備援使用。
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        """取得快取值，不存在或已過期時回傳 None"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def get_stale(self, key: K) -> V | None:
+        """取得快取值（不論是否過期），不存在時回傳 None"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        return entry[1]
+
+    def set(self, key: K, value: V, ttl_seconds: float) -> None:
+        """寫入快取值，超過容量時淘汰最久未使用的項目"""
+        self._data[key] = (time.monotonic() + ttl_seconds, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """清除所有快取"""
+        self._data.clear()
@@ -1,4 +1,6 @@
 """應用程式配置設定"""
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -9,12 +11,23 @@ class Settings(BaseSettings):
         env_file=".env",
         env_file_encoding="utf-8",
         case_sensitive=False,
+        # .env.example 中尚有其他服務使用的設定，忽略未宣告的項目
+        extra="ignore",
     )
 
     # 應用程式設定
     app_name: str = "Stock Intraday Diff Service"
     debug: bool = False
 
+    # 快取設定
+    cache_ttl_seconds: int = 600
+    intraday_cache_ttl_seconds: int = 60
+
+    # 資料源設定
+    max_concurrent_requests: int = 10
+
 
-# 全域設定實例
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """取得全域設定（首次呼叫時才讀取 .env）"""
+    return Settings()
@@ -0,0 +1,38 @@
+"""共用 HTTP 連線池"""
+import httpx
+
+# 目前使用中的非同步 HTTP client，跨請求重複使用 TCP/TLS 連線
+_client: httpx.AsyncClient | None = None
+
+
+def create_client(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    """建立新的 HTTP client"""
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(15.0, connect=5.0),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        headers={"User-Agent": "Mozilla/5.0"},
+        transport=transport,
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """取得共用的 HTTP client，尚未建立或已關閉時重新建立"""
+    global _client  # noqa: PLW0603
+    if _client is None or _client.is_closed:
+        _client = create_client()
+    return _client
+
+
+def set_client(client: httpx.AsyncClient) -> None:
+    """替換共用的 HTTP client（應用程式啟動或測試時使用）"""
+    global _client  # noqa: PLW0603
+    _client = client
+
+
+async def close_client() -> None:
+    """關閉共用的 HTTP client"""
+    global _client  # noqa: PLW0603
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -1,15 +1,62 @@
 """FastAPI 主應用程式"""
-import json
-import urllib.request
+import asyncio
+import calendar
+import weakref
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import date as Date  # noqa: N812 - 參數 date 為日期字串
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
+import httpx
+import orjson
 from fastapi import FastAPI, Request, status
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 
+from app.cache import TTLCache
+from app.config import get_settings
+from app.http_client import close_client, create_client, get_client, set_client
 from app.models import RawDataRequest
 
+# 價格時間點皆以台北時間解讀
+TAIPEI_TZ = ZoneInfo("Asia/Taipei")
+
+# 以 (symbol, 日期) 快取 Yahoo Finance K 線資料，TTL 於寫入時依設定決定
+chart_cache: TTLCache[tuple[str, Date], dict[int, float]] = TTLCache()
+
+# 進行中的 K 線下載，供同時到達的相同查詢共用
+inflight_charts: dict[tuple[str, Date], asyncio.Task] = {}
+
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart"
+
+# 以過期快取回應時，於 error 欄位註明
+STALE_CACHE_NOTE = "Yahoo Finance request failed; served from stale cache"
+
+# 限制同時對 Yahoo Finance 發出的請求數，避免被限流（每個 event loop 各一個）
+yahoo_semaphores: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_yahoo_semaphore() -> asyncio.Semaphore:
+    """取得目前 event loop 的 Yahoo 請求併發限制"""
+    loop = asyncio.get_running_loop()
+    semaphore = yahoo_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(get_settings().max_concurrent_requests)
+        yahoo_semaphores[loop] = semaphore
+    return semaphore
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """應用程式生命週期：啟動時建立 HTTP 連線池，關閉時釋放"""
+    set_client(create_client())
+    yield
+    await close_client()
+
+
 # 建立 FastAPI 應用程式
 app = FastAPI(
     title="Stock Intraday Diff Service",
@@ -17,14 +64,19 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
+# 系統內部錯誤的回應內容固定，預先編碼
+INTERNAL_ERROR_BODY = orjson.dumps({"detail": "系統內部錯誤，請稍後再試"})
+
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(
     request: Request,
     exc: RequestValidationError,
-) -> JSONResponse:
+) -> ORJSONResponse:
     """處理請求驗證錯誤（422）"""
     # 格式化錯誤訊息
     formatted_errors = []
@@ -33,7 +85,7 @@ async def validation_exception_handler(
         message = error["msg"]
         formatted_errors.append(f"{field}: {message}")
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={
             "detail": {
@@ -48,44 +100,150 @@ async def validation_exception_handler(
 async def general_exception_handler(
     request: Request,
     exc: Exception,
-) -> JSONResponse:
+) -> Response:
     """處理未預期的錯誤"""
-    return JSONResponse(
+    return Response(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        content={"detail": "系統內部錯誤，請稍後再試"},
+        content=INTERNAL_ERROR_BODY,
+        media_type="application/json",
     )
 
 
-@app.get("/")
-async def root() -> dict:
-    """根路徑 - API 說明"""
-    return {
-        "service": "Stock Intraday Diff Service",
-        "version": "1.0.0",
-        "endpoints": {
-            "POST /api/intraday-diff": "批次查詢股票指定兩個時間點的開盤價及價差",
-            "GET /health": "健康檢查",
-            "GET /docs": "Swagger UI 文件",
-        },
-        "example": {
-            "url": "POST /api/intraday-diff",
-            "body": {
-                "symbols": ["2330.TW", "2317.TW"],
-                "date": "2026-01-28",
-                "time1": "09:00",
-                "time2": "09:50"
-            }
+# 根路徑與健康檢查的回應內容固定，預先編碼
+ROOT_BODY = orjson.dumps({
+    "service": "Stock Intraday Diff Service",
+    "version": "1.0.0",
+    "endpoints": {
+        "POST /api/intraday-diff": "批次查詢股票指定兩個時間點的開盤價及價差",
+        "GET /health": "健康檢查",
+        "GET /docs": "Swagger UI 文件",
+    },
+    "example": {
+        "url": "POST /api/intraday-diff",
+        "body": {
+            "symbols": ["2330.TW", "2317.TW"],
+            "date": "2026-01-28",
+            "time1": "09:00",
+            "time2": "09:50"
         }
     }
+})
+HEALTH_BODY = orjson.dumps({"status": "healthy"})
+
+
+@app.get("/")
+async def root() -> Response:
+    """根路徑 - API 說明"""
+    return Response(content=ROOT_BODY, media_type="application/json")
 
 
 @app.get("/health")
-async def health_check() -> dict[str, str]:
+async def health_check() -> Response:
     """健康檢查"""
-    return {"status": "healthy"}
+    return Response(content=HEALTH_BODY, media_type="application/json")
 
 
-def fetch_symbol_data(symbol: str, date: str, time1: str, time2: str) -> dict:
+async def fetch_chart(
+    symbol: str,
+    target_date: Date,
+) -> tuple[dict[int, float] | None, bool]:
+    """
+    取得單一股票指定日期以時間戳索引的 5 分鐘 K 線開盤價（含快取）
+    
+    同一 (symbol, 日期) 同時有多個查詢時，只會對 Yahoo 發出一次請求。
+    
+    Args:
+        symbol: 股票代碼（如 2330.TW）
+        target_date: 日期
+    
+    Returns:
+        ({Unix 時間戳: 開盤價}, 是否為過期快取)，API 無資料時資料為 None
+    """
+    cache_key = (symbol, target_date)
+    cached = chart_cache.get(cache_key)
+    if cached is not None:
+        return cached, False
+    
+    task = inflight_charts.get(cache_key)
+    if task is None:
+        task = asyncio.create_task(download_chart(symbol, target_date))
+        inflight_charts[cache_key] = task
+        task.add_done_callback(lambda _: inflight_charts.pop(cache_key, None))
+    
+    # 避免單一查詢被取消時連帶取消其他人共用的下載
+    return await asyncio.shield(task)
+
+
+async def download_chart(
+    symbol: str,
+    target_date: Date,
+) -> tuple[dict[int, float] | None, bool]:
+    """調用 Yahoo Finance API 下載 K 線資料並寫入快取，回傳格式同 fetch_chart"""
+    cache_key = (symbol, target_date)
+    
+    start_dt = datetime(
+        target_date.year, target_date.month, target_date.day, 0, 0, 0, tzinfo=TAIPEI_TZ
+    )
+    end_dt = datetime(
+        target_date.year, target_date.month, target_date.day, 23, 59, 59, tzinfo=TAIPEI_TZ
+    )
+    
+    period1 = int(start_dt.timestamp())
+    period2 = int(end_dt.timestamp())
+    
+    # 調用 Yahoo Finance API（使用 5 分鐘間隔）
+    try:
+        async with get_yahoo_semaphore():
+            response = await get_client().get(
+                f"{YAHOO_CHART_URL}/{symbol}",
+                params={"interval": "5m", "period1": period1, "period2": period2},
+            )
+        response.raise_for_status()
+        json_data = orjson.loads(response.content)
+    except (httpx.HTTPError, orjson.JSONDecodeError):
+        # Yahoo 暫時無法使用（含回傳非 JSON 的限流頁面）時，以過期的快取資料備援
+        stale = chart_cache.get_stale(cache_key)
+        if stale is not None:
+            return stale, True
+        raise
+    
+    chart = json_data.get("chart", {})
+    chart_result = chart.get("result", [])
+    
+    if not chart_result:
+        return None, False
+    
+    data = chart_result[0]
+    timestamps = data.get("timestamp", [])
+    indicators = data.get("indicators", {})
+    quote = indicators.get("quote", [{}])[0]
+    opens = quote.get("open", [])
+    
+    # 建立時間戳索引，之後每個時間點都是 O(1) 查詢
+    chart_data = {
+        ts: open_price
+        for ts, open_price in zip(timestamps, opens, strict=False)
+        if ts is not None and open_price is not None
+    }
+    
+    # 當日盤中資料仍在更新，只短暫快取
+    settings = get_settings()
+    is_intraday = target_date >= datetime.now(TAIPEI_TZ).date()
+    ttl_seconds = (
+        settings.intraday_cache_ttl_seconds if is_intraday else settings.cache_ttl_seconds
+    )
+    chart_cache.set(cache_key, chart_data, ttl_seconds)
+    return chart_data, False
+
+
+def to_timestamp(target_date: Date, time_str: str) -> int:
+    """將日期與 HH:MM 時間點轉為台北時間的 Unix 時間戳"""
+    # 只取時間部分，時區於下方 combine 時指定
+    target_time = datetime.strptime(time_str, "%H:%M").time()  # noqa: DTZ007
+    return int(datetime.combine(target_date, target_time, tzinfo=TAIPEI_TZ).timestamp())
+
+
+async def fetch_symbol_data(symbol: str, date: str, time1: str, time2: str) -> dict:
     """
     取得單一股票指定兩個時間點的開盤價及價差
     
@@ -109,56 +267,43 @@ def fetch_symbol_data(symbol: str, date: str, time1: str, time2: str) -> dict:
     try:
         # 解析日期
         target_date = datetime.strptime(date, "%Y-%m-%d").date()
-        tz = ZoneInfo("Asia/Taipei")
         
-        start_dt = datetime(target_date.year, target_date.month, target_date.day, 0, 0, 0, tzinfo=tz)
-        end_dt = datetime(target_date.year, target_date.month, target_date.day, 23, 59, 59, tzinfo=tz)
+        # 週末不開盤，不需調用 API
+        if target_date.weekday() >= calendar.SATURDAY:
+            result["error"] = "Market closed on weekend"
+            return result
         
-        period1 = int(start_dt.timestamp())
-        period2 = int(end_dt.timestamp())
+        chart_data, is_stale = await fetch_chart(symbol, target_date)
+        if chart_data is None:
+            result["error"] = "No data in API response"
+            return result
         
-        # 調用 Yahoo Finance API（使用 5 分鐘間隔）
-        url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}?interval=5m&period1={period1}&period2={period2}"
+        # Yahoo 的 K 線時間戳對齊整點分鐘，直接以整數查詢
+        open_1 = chart_data.get(to_timestamp(target_date, time1))
+        open_2 = chart_data.get(to_timestamp(target_date, time2))
         
-        req = urllib.request.Request(
-            url,
-            headers={"User-Agent": "Mozilla/5.0"}
-        )
+        if open_1 is not None:
+            result["open_1"] = round(open_1, 2)
+        if open_2 is not None:
+            result["open_2"] = round(open_2, 2)
         
-        with urllib.request.urlopen(req, timeout=15) as response:
-            raw_data = response.read()
-            json_data = json.loads(raw_data)
-            
-            chart = json_data.get("chart", {})
-            chart_result = chart.get("result", [])
-            
-            if chart_result:
-                data = chart_result[0]
-                timestamps = data.get("timestamp", [])
-                indicators = data.get("indicators", {})
-                quote = indicators.get("quote", [{}])[0]
-                
-                opens = quote.get("open", [])
-                
-                # 找到指定時間的 open 價格
-                for i, ts in enumerate(timestamps):
-                    if ts is None:
-                        continue
-                    
-                    dt = datetime.fromtimestamp(ts, tz=tz)
-                    time_str = dt.strftime("%H:%M")
-                    
-                    if time_str == time1 and i < len(opens) and opens[i] is not None:
-                        result["open_1"] = round(opens[i], 2)
-                    elif time_str == time2 and i < len(opens) and opens[i] is not None:
-                        result["open_2"] = round(opens[i], 2)
-                
-                # 計算價差
-                if result["open_1"] is not None and result["open_2"] is not None:
-                    result["diff"] = round(result["open_2"] - result["open_1"], 2)
-            else:
-                result["error"] = "No data in API response"
+        # 計算價差
+        if result["open_1"] is not None and result["open_2"] is not None:
+            result["diff"] = round(result["open_2"] - result["open_1"], 2)
+        
+        # 價格來自過期快取，可能缺少之後才出現的 K 線
+        if is_stale:
+            result["error"] = STALE_CACHE_NOTE
                 
+    except httpx.HTTPStatusError as e:
+        # 維持精簡的錯誤訊息，不外洩上游完整網址
+        result["error"] = f"HTTP Error {e.response.status_code}: {e.response.reason_phrase}"
+    except httpx.TimeoutException:
+        # httpx 的逾時例外訊息常為空字串，改用固定訊息
+        result["error"] = "Yahoo Finance request timed out"
+    except httpx.TransportError as e:
+        detail = str(e) or type(e).__name__
+        result["error"] = f"Yahoo Finance request failed: {detail}"
     except Exception as e:
         result["error"] = str(e)
     
@@ -166,7 +311,7 @@ def fetch_symbol_data(symbol: str, date: str, time1: str, time2: str) -> dict:
 
 
 @app.post("/api/intraday-diff")
-async def get_intraday_diff(request: RawDataRequest) -> list[dict]:
+async def get_intraday_diff(request: RawDataRequest) -> ORJSONResponse:
     """
     取得多檔股票指定兩個時間點的開盤價及價差
     
@@ -178,10 +323,21 @@ async def get_intraday_diff(request: RawDataRequest) -> list[dict]:
     
     Response: 陣列，每個元素包含 symbol, date, time1, time2, open_1, open_2, diff
     """
-    results = []
+    # 單一股票直接查詢，不需建立並行任務
+    if len(request.symbols) == 1:
+        data = await fetch_symbol_data(
+            request.symbols[0], request.date, request.time1, request.time2
+        )
+        return ORJSONResponse([data])
     
-    for symbol in request.symbols:
-        data = fetch_symbol_data(symbol, request.date, request.time1, request.time2)
-        results.append(data)
+    # 各股票查詢彼此獨立，同時發出
+    async with asyncio.TaskGroup() as tg:
+        tasks = [
+            tg.create_task(
+                fetch_symbol_data(symbol, request.date, request.time1, request.time2)
+            )
+            for symbol in request.symbols
+        ]
     
-    return results
+    # 結果皆為基本型別，直接序列化，略過 response_model 的驗證與轉換
+    return ORJSONResponse([task.result() for task in tasks])
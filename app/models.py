@@ -1,7 +1,7 @@
 """資料模型定義"""
 from typing import Annotated
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 
 class RawDataRequest(BaseModel):
@@ -36,3 +36,13 @@ class RawDataRequest(BaseModel):
             description="第二個時間點，格式 HH:MM，例如 09:50",
         ),
     ]
+
+    @field_validator("symbols")
+    @classmethod
+    def normalize_symbols(cls, v: list[str]) -> list[str]:
+        """去除空白並轉為大寫，移除重複代碼（保留原順序）"""
+        cleaned = [symbol.strip().upper() for symbol in v]
+        if not all(cleaned):
+            msg = "symbols 中不可包含空字串"
+            raise ValueError(msg)
+        return list(dict.fromkeys(cleaned))
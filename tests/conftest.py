@@ -0,0 +1,31 @@
+"""測試共用 fixture"""
+from collections.abc import AsyncIterator, Callable, Iterator
+
+import httpx
+import pytest
+
+from app import http_client
+from app.main import chart_cache, inflight_charts
+from tests.helpers import Handler
+
+
+@pytest.fixture(autouse=True)
+def _reset_chart_state() -> Iterator[None]:
+    """每個測試前後清空 K 線快取與進行中的下載"""
+    chart_cache.clear()
+    inflight_charts.clear()
+    yield
+    chart_cache.clear()
+    inflight_charts.clear()
+
+
+@pytest.fixture()
+async def install_transport() -> AsyncIterator[Callable[[Handler], None]]:
+    """以 httpx.MockTransport 取代對 Yahoo Finance 的實際請求"""
+
+    def install(handler: Handler) -> None:
+        transport = httpx.MockTransport(handler)
+        http_client.set_client(http_client.create_client(transport=transport))
+
+    yield install
+    await http_client.close_client()
@@ -0,0 +1,31 @@
+"""測試共用常數與輔助函式"""
+from collections.abc import Awaitable, Callable
+
+import httpx
+
+# 2026-01-28（週三）台北時間 09:00 與 09:50 的 Unix 時間戳
+TS_0900 = 1769562000
+TS_0950 = TS_0900 + 50 * 60
+
+OPEN_0900 = 1050.0
+OPEN_0950 = 1055.0
+DIFF = 5.0
+
+Handler = Callable[[httpx.Request], httpx.Response | Awaitable[httpx.Response]]
+
+
+def chart_response(opens_by_ts: dict[int, float]) -> httpx.Response:
+    """建立 Yahoo Finance chart API 格式的回應"""
+    return httpx.Response(
+        200,
+        json={
+            "chart": {
+                "result": [
+                    {
+                        "timestamp": list(opens_by_ts),
+                        "indicators": {"quote": [{"open": list(opens_by_ts.values())}]},
+                    }
+                ]
+            }
+        },
+    )
@@ -0,0 +1,75 @@
+"""TTLCache 測試"""
+from app.cache import TTLCache
+
+
+def test_get_returns_fresh_value() -> None:
+    cache: TTLCache[str, str] = TTLCache()
+    cache.set("a", "v1", ttl_seconds=60)
+
+    assert cache.get("a") == "v1"
+
+
+def test_get_missing_key_returns_none() -> None:
+    cache: TTLCache[str, str] = TTLCache()
+
+    assert cache.get("a") is None
+    assert cache.get_stale("a") is None
+
+
+def test_expired_value_is_hidden_from_get() -> None:
+    cache: TTLCache[str, str] = TTLCache()
+    cache.set("a", "v1", ttl_seconds=0)
+
+    assert cache.get("a") is None
+
+
+def test_ttl_is_per_entry() -> None:
+    cache: TTLCache[str, str] = TTLCache()
+    cache.set("short", "v1", ttl_seconds=0)
+    cache.set("long", "v2", ttl_seconds=60)
+
+    assert cache.get("short") is None
+    assert cache.get("long") == "v2"
+
+
+def test_set_overwrites_previous_ttl() -> None:
+    cache: TTLCache[str, str] = TTLCache()
+    cache.set("a", "v1", ttl_seconds=0)
+    cache.set("a", "v2", ttl_seconds=60)
+
+    assert cache.get("a") == "v2"
+
+
+def test_get_stale_returns_expired_value() -> None:
+    cache: TTLCache[str, str] = TTLCache()
+    cache.set("a", "v1", ttl_seconds=0)
+
+    assert cache.get_stale("a") == "v1"
+
+
+def test_evicts_least_recently_used_beyond_maxsize() -> None:
+    cache: TTLCache[str, str] = TTLCache(maxsize=2)
+    cache.set("a", "v1", ttl_seconds=60)
+    cache.set("b", "v2", ttl_seconds=60)
+    cache.get("a")
+    cache.set("c", "v3", ttl_seconds=60)
+
+    assert cache.get("a") == "v1"
+    assert cache.get_stale("b") is None
+    assert cache.get("c") == "v3"
+
+
+def test_expired_entries_are_evicted_by_capacity() -> None:
+    cache: TTLCache[str, str] = TTLCache(maxsize=1)
+    cache.set("a", "v1", ttl_seconds=0)
+    cache.set("b", "v2", ttl_seconds=60)
+
+    assert cache.get_stale("a") is None
+
+
+def test_clear_removes_everything() -> None:
+    cache: TTLCache[str, str] = TTLCache()
+    cache.set("a", "v1", ttl_seconds=60)
+    cache.clear()
+
+    assert cache.get_stale("a") is None
@@ -0,0 +1,315 @@
+"""Yahoo Finance K 線查詢測試"""
+import asyncio
+from collections.abc import Callable
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app import cache, main
+from app.config import Settings
+from app.main import (
+    STALE_CACHE_NOTE,
+    TAIPEI_TZ,
+    chart_cache,
+    fetch_chart,
+    fetch_symbol_data,
+    inflight_charts,
+)
+from tests.helpers import (
+    DIFF,
+    OPEN_0900,
+    OPEN_0950,
+    TS_0900,
+    TS_0950,
+    Handler,
+    chart_response,
+)
+
+TARGET_DATE = date(2026, 1, 28)
+CACHE_KEY = ("2330.TW", TARGET_DATE)
+
+
+async def query() -> dict:
+    return await fetch_symbol_data("2330.TW", "2026-01-28", "09:00", "09:50")
+
+
+async def test_returns_opens_and_diff(install_transport: Callable[[Handler], None]) -> None:
+    install_transport(lambda _: chart_response({TS_0900: OPEN_0900, TS_0950: OPEN_0950}))
+
+    result = await query()
+
+    assert result["open_1"] == OPEN_0900
+    assert result["open_2"] == OPEN_0950
+    assert result["diff"] == DIFF
+    assert result["error"] is None
+
+
+async def test_http_error_uses_short_message(
+    install_transport: Callable[[Handler], None],
+) -> None:
+    install_transport(lambda _: httpx.Response(404))
+
+    result = await query()
+
+    assert result["error"] == "HTTP Error 404: Not Found"
+
+
+async def test_timeout_reports_non_empty_message(
+    install_transport: Callable[[Handler], None],
+) -> None:
+    def time_out(request: httpx.Request) -> httpx.Response:
+        msg = ""
+        raise httpx.ReadTimeout(msg, request=request)
+
+    install_transport(time_out)
+
+    result = await query()
+
+    assert result["open_1"] is None
+    assert result["error"] == "Yahoo Finance request timed out"
+
+
+async def test_transport_error_without_message_reports_error_type(
+    install_transport: Callable[[Handler], None],
+) -> None:
+    def fail(request: httpx.Request) -> httpx.Response:
+        msg = ""
+        raise httpx.ConnectError(msg, request=request)
+
+    install_transport(fail)
+
+    result = await query()
+
+    assert result["error"] == "Yahoo Finance request failed: ConnectError"
+
+
+async def test_http_error_falls_back_to_stale_cache(
+    install_transport: Callable[[Handler], None],
+) -> None:
+    chart_cache.set(CACHE_KEY, {TS_0900: OPEN_0900}, ttl_seconds=0)
+    install_transport(lambda _: httpx.Response(503))
+
+    result = await query()
+
+    assert result["open_1"] == OPEN_0900
+    assert result["open_2"] is None
+    assert result["error"] == STALE_CACHE_NOTE
+
+
+async def test_transport_error_falls_back_to_stale_cache(
+    install_transport: Callable[[Handler], None],
+) -> None:
+    chart_cache.set(CACHE_KEY, {TS_0900: OPEN_0900, TS_0950: OPEN_0950}, ttl_seconds=0)
+
+    def fail(request: httpx.Request) -> httpx.Response:
+        msg = "connection refused"
+        raise httpx.ConnectError(msg, request=request)
+
+    install_transport(fail)
+
+    result = await query()
+
+    assert result["diff"] == DIFF
+    assert result["error"] == STALE_CACHE_NOTE
+
+
+async def test_http_error_without_cache_reports_error(
+    install_transport: Callable[[Handler], None],
+) -> None:
+    install_transport(lambda _: httpx.Response(503))
+
+    result = await query()
+
+    assert result["open_1"] is None
+    assert result["error"] == "HTTP Error 503: Service Unavailable"
+
+
+async def test_non_json_response_falls_back_to_stale_cache(
+    install_transport: Callable[[Handler], None],
+) -> None:
+    chart_cache.set(CACHE_KEY, {TS_0900: OPEN_0900}, ttl_seconds=0)
+    install_transport(lambda _: httpx.Response(200, content=b"<html>consent</html>"))
+
+    result = await query()
+
+    assert result["open_1"] == OPEN_0900
+    assert result["error"] == STALE_CACHE_NOTE
+
+
+async def test_non_json_response_without_cache_reports_error(
+    install_transport: Callable[[Handler], None],
+) -> None:
+    install_transport(lambda _: httpx.Response(200, content=b"<html>consent</html>"))
+
+    result = await query()
+
+    assert result["open_1"] is None
+    assert result["error"]
+
+
+async def test_fresh_cache_skips_yahoo(install_transport: Callable[[Handler], None]) -> None:
+    chart_cache.set(CACHE_KEY, {TS_0900: OPEN_0900, TS_0950: OPEN_0950}, ttl_seconds=60)
+    calls: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(500)
+
+    install_transport(handler)
+
+    result = await query()
+
+    assert calls == []
+    assert result["diff"] == DIFF
+    assert result["error"] is None
+
+
+async def test_weekend_skips_yahoo(install_transport: Callable[[Handler], None]) -> None:
+    calls: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return chart_response({TS_0900: OPEN_0900})
+
+    install_transport(handler)
+
+    # 2026-01-31 為週六
+    result = await fetch_symbol_data("2330.TW", "2026-01-31", "09:00", "09:50")
+
+    assert calls == []
+    assert result["open_1"] is None
+    assert result["error"] == "Market closed on weekend"
+
+
+class FrozenDatetime(datetime):
+    """固定「現在」為 2026-01-28 10:00（台北時間）"""
+
+    @classmethod
+    def now(cls, tz: object = None) -> datetime:  # noqa: ARG003
+        return datetime(2026, 1, 28, 10, 0, tzinfo=TAIPEI_TZ)
+
+
+async def test_intraday_chart_uses_short_ttl(
+    install_transport: Callable[[Handler], None],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    monkeypatch.setattr(main, "datetime", FrozenDatetime)
+    settings = Settings(cache_ttl_seconds=600, intraday_cache_ttl_seconds=60)
+    monkeypatch.setattr(main, "get_settings", lambda: settings)
+    install_transport(lambda _: chart_response({TS_0900: OPEN_0900}))
+
+    today_key = ("2330.TW", date(2026, 1, 28))
+    past_key = ("2330.TW", date(2026, 1, 27))
+    await fetch_chart(*today_key)
+    await fetch_chart(*past_key)
+
+    clock.now += settings.intraday_cache_ttl_seconds
+    assert chart_cache.get(today_key) is None
+    assert chart_cache.get(past_key) is not None
+
+    clock.now = 1000.0 + settings.cache_ttl_seconds
+    assert chart_cache.get(past_key) is None
+
+
+class GatedYahoo:
+    """在測試放行前保持請求進行中的 Yahoo 替身，並記錄請求次數"""
+
+    def __init__(self, response: httpx.Response) -> None:
+        self.response = response
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def __call__(self, _request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        self.started.set()
+        await self.release.wait()
+        return self.response
+
+
+async def test_concurrent_callers_share_one_download(
+    install_transport: Callable[[Handler], None],
+) -> None:
+    yahoo = GatedYahoo(chart_response({TS_0900: OPEN_0900}))
+    install_transport(yahoo)
+
+    callers = [asyncio.create_task(fetch_chart(*CACHE_KEY)) for _ in range(5)]
+    await yahoo.started.wait()
+    yahoo.release.set()
+    results = await asyncio.gather(*callers)
+
+    assert yahoo.calls == 1
+    assert all(result == ({TS_0900: OPEN_0900}, False) for result in results)
+    assert inflight_charts == {}
+
+
+async def test_concurrent_symbols_download_separately(
+    install_transport: Callable[[Handler], None],
+) -> None:
+    yahoo = GatedYahoo(chart_response({TS_0900: OPEN_0900}))
+    install_transport(yahoo)
+
+    callers = [
+        asyncio.create_task(fetch_chart(symbol, TARGET_DATE))
+        for symbol in ("2330.TW", "2317.TW")
+        for _ in range(5)
+    ]
+    await yahoo.started.wait()
+    yahoo.release.set()
+    await asyncio.gather(*callers)
+
+    assert yahoo.calls == len(("2330.TW", "2317.TW"))
+
+
+async def test_cancelled_waiter_does_not_cancel_shared_download(
+    install_transport: Callable[[Handler], None],
+) -> None:
+    yahoo = GatedYahoo(chart_response({TS_0900: OPEN_0900}))
+    install_transport(yahoo)
+
+    first = asyncio.create_task(fetch_chart(*CACHE_KEY))
+    second = asyncio.create_task(fetch_chart(*CACHE_KEY))
+    await yahoo.started.wait()
+    download = inflight_charts[CACHE_KEY]
+
+    first.cancel()
+    await asyncio.gather(first, return_exceptions=True)
+    yahoo.release.set()
+
+    assert first.cancelled()
+    assert await second == ({TS_0900: OPEN_0900}, False)
+    assert not download.cancelled()
+    assert yahoo.calls == 1
+
+
+async def test_inflight_entry_removed_after_failure(
+    install_transport: Callable[[Handler], None],
+) -> None:
+    yahoo = GatedYahoo(httpx.Response(503))
+    install_transport(yahoo)
+
+    callers = [asyncio.create_task(fetch_chart(*CACHE_KEY)) for _ in range(3)]
+    await yahoo.started.wait()
+    yahoo.release.set()
+    results = await asyncio.gather(*callers, return_exceptions=True)
+
+    assert yahoo.calls == 1
+    assert all(isinstance(result, httpx.HTTPStatusError) for result in results)
+    assert inflight_charts == {}
+
+
+async def test_next_call_after_failure_retries_yahoo(
+    install_transport: Callable[[Handler], None],
+) -> None:
+    responses = iter([httpx.Response(503), chart_response({TS_0900: OPEN_0900})])
+    install_transport(lambda _: next(responses))
+
+    first = await query()
+    second = await query()
+
+    assert first["error"] == "HTTP Error 503: Service Unavailable"
+    assert second["open_1"] == OPEN_0900
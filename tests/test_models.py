@@ -0,0 +1,55 @@
+"""請求模型驗證測試"""
+from datetime import date
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.main import app, chart_cache
+from app.models import RawDataRequest
+from tests.helpers import OPEN_0900, OPEN_0950, TS_0900, TS_0950
+
+
+def test_symbols_are_stripped_and_upper_cased() -> None:
+    request = RawDataRequest(symbols=[" 2330.tw ", "2317.Tw"])
+
+    assert request.symbols == ["2330.TW", "2317.TW"]
+
+
+def test_duplicate_symbols_are_removed_in_first_seen_order() -> None:
+    request = RawDataRequest(symbols=["2317.TW", "2330.tw", " 2317.tw", " 2330.TW "])
+
+    assert request.symbols == ["2317.TW", "2330.TW"]
+
+
+def test_blank_symbol_is_rejected() -> None:
+    with pytest.raises(ValidationError, match="symbols 中不可包含空字串"):
+        RawDataRequest(symbols=["2330.TW", " "])
+
+
+def test_api_returns_one_row_per_normalized_symbol() -> None:
+    # 預先寫入快取，不需對 Yahoo 發出請求
+    chart = {TS_0900: OPEN_0900, TS_0950: OPEN_0950}
+    for symbol in ("2330.TW", "2317.TW"):
+        chart_cache.set((symbol, date(2026, 1, 28)), chart, ttl_seconds=60)
+
+    response = TestClient(app).post(
+        "/api/intraday-diff",
+        json={"symbols": ["2317.tw", "2330.tw", " 2330.TW ", "2317.TW"], "date": "2026-01-28"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [row["symbol"] for row in response.json()] == ["2317.TW", "2330.TW"]
+
+
+def test_api_rejects_blank_symbol_with_formatted_error() -> None:
+    response = TestClient(app).post("/api/intraday-diff", json={"symbols": [" "]})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json() == {
+        "detail": {
+            "message": "請求資料驗證失敗",
+            "errors": ["body -> symbols: Value error, symbols 中不可包含空字串"],
+        }
+    }